@@ -1,847 +1,1474 @@
-from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
-import requests
-from bs4 import BeautifulSoup
-from functools import lru_cache
-import logging
-from typing import List, Dict, Optional
-import time
-import math
-import json
-import asyncio
-from collections import defaultdict
-from datetime import datetime, timedelta
-from contextlib import asynccontextmanager
-import signal
-import uuid
-
-
-
-# Setup basic logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize FastAPI app
-app = FastAPI(title="SEC N-PORT Viewer")
-active_tasks = {}
-
-
-# Configure CORS to allow frontend access
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# SEC requires proper headers for API access
-SEC_HEADERS = {
-    "User-Agent": "NPortViewer/1.0 contact@example.com",
-    "Accept-Encoding": "gzip, deflate",
-    "Accept-Language": "en-US,en;q=0.9",
-}
-
-# Create reusable session for better performance
-session = requests.Session()
-session.headers.update(SEC_HEADERS)
-
-# All valid N-PORT form types
-NPORT_FORMS = {"NPORT-P", "NPORT-P/A", "NPORT-NRT", "NPORT-NRT/A"}
-
-
-# WRONG (line ~94):
-requests_per_minute=10,
-requests_per_hour=100
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    yield
-    # Shutdown - cleanup tasks
-    for task_id in list(active_tasks.keys()):
-        if task_id in active_tasks:
-            active_tasks[task_id].cancel()
-    active_tasks.clear()
-app.router.lifespan_context = lifespan
-
-
-
-class RateLimiter:
-    def __init__(self, requests_per_minute: int = 10, requests_per_hour: int = 100):
-        self.requests_per_minute = requests_per_minute
-        self.requests_per_hour = requests_per_hour
-        self.minute_requests = defaultdict(list)
-        self.hour_requests = defaultdict(list)
-    
-    def is_allowed(self, ip: str) -> tuple[bool, Optional[str]]:
-        """
-        Check if this IP can make another request.
-        Returns (allowed, error_message)
-        """
-        current_time = datetime.now()
-        
-        # Calculate cutoff times
-        one_hour_ago = current_time - timedelta(hours=1)
-        one_minute_ago = current_time - timedelta(minutes=1)
-        
-        # Clean up old request timestamps
-        self.minute_requests[ip] = [
-            timestamp for timestamp in self.minute_requests[ip]
-            if timestamp > one_minute_ago
-        ]
-        
-        self.hour_requests[ip] = [
-            timestamp for timestamp in self.hour_requests[ip]
-            if timestamp > one_hour_ago
-        ]
-        
-        if len(self.minute_requests[ip]) >= self.requests_per_minute:
-            return False, f"Rate limit exceeded: {self.requests_per_minute} requests/min"
-    
-        if len(self.hour_requests[ip]) >= self.requests_per_hour:
-            # Freeze for 15 minutes on hour limit
-            freeze_until = datetime.now() + timedelta(minutes=15)
-            return False, f"Hourly limit hit. Frozen until {freeze_until.strftime('%H:%M')}"
-        
-        return True, None
-    
-    def add_request(self, ip: str):
-        """Add request timestamp for this IP"""
-        current_time = datetime.now()
-        self.minute_requests[ip].append(current_time)
-        self.hour_requests[ip].append(current_time)
-    
-    def get_stats(self, ip: str) -> Dict:
-        """Get rate limit stats for IP"""
-        current_time = datetime.now()
-        one_minute_ago = current_time - timedelta(minutes=1)
-        one_hour_ago = current_time - timedelta(hours=1)
-        
-        minute_count = len([t for t in self.minute_requests[ip] if t > one_minute_ago])
-        hour_count = len([t for t in self.hour_requests[ip] if t > one_hour_ago])
-        
-        return {
-            "requests_last_minute": minute_count,
-            "requests_last_hour": hour_count,
-            "limit_minute": self.requests_per_minute,
-            "limit_hour": self.requests_per_hour,
-            "remaining_minute": self.requests_per_minute - minute_count,
-            "remaining_hour": self.requests_per_hour - hour_count
-        }
-
-# Create global instance AFTER class definition
-rate_limiter = RateLimiter()
-
-
-
-def get_client_ip(request: Request) -> str:
-    """Extract the real client IP, handling proxies"""
-    # Check if behind a proxy
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        # Take the first IP in the chain
-        return forwarded.split(",")[0].strip()
-
-    # Check for real IP header
-    real_ip = request.headers.get("X-Real-IP")
-    if real_ip:
-        return real_ip
-
-    # Fallback to direct connection IP
-    return request.client.host if request.client else "unknown"
-
-
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    excluded_paths = ["/", "/cache/clear", "/rate-limit/stats", "/cache/info"]
-    if request.url.path in excluded_paths:
-        return await call_next(request)
-
-    client_ip = get_client_ip(request)
-    allowed, error_msg = rate_limiter.is_allowed(client_ip)
-    
-    if not allowed:
-        logger.warning(f"Rate limit hit for IP: {client_ip}")
-        return JSONResponse(
-            status_code=429,
-            content={"detail": error_msg, "client_ip": client_ip},
-            headers={"Retry-After": "60"}
-        )
-
-    # ADD THIS LINE - track the request
-    rate_limiter.add_request(client_ip)
-    
-    response = await call_next(request)
-    
-    # Update headers with current stats
-    stats = rate_limiter.get_stats(client_ip)
-    response.headers["X-RateLimit-Limit-Minute"] = str(rate_limiter.requests_per_minute)
-    response.headers["X-RateLimit-Remaining-Minute"] = str(rate_limiter.requests_per_minute - stats["requests_last_minute"])
-    response.headers["X-RateLimit-Limit-Hour"] = str(rate_limiter.requests_per_hour)
-    response.headers["X-RateLimit-Remaining-Hour"] = str(rate_limiter.requests_per_hour - stats["requests_last_hour"])
-    
-    return response
-
-
-@app.get("/")
-def health():
-    """Simple health check endpoint"""
-    return {"status": "running", "service": "SEC N-PORT Viewer"}
-
-
-@app.get("/rate-limit/stats")
-def rate_limit_stats(request: Request):
-    """Check your current rate limit status"""
-    client_ip = get_client_ip(request)
-    stats = rate_limiter.get_stats(client_ip)
-    stats["client_ip"] = client_ip
-    return stats
-
-
-@lru_cache(maxsize=256)
-def get_nport_metadata(cik: str):
-    """
-    Fetch N-PORT filing metadata from SEC for a given CIK.
-    Returns info about all N-PORT filings on the latest date.
-    """
-    try:
-        # Pad CIK to 10 digits
-        padded_cik = cik.zfill(10)
-        url = f"https://data.sec.gov/submissions/CIK{padded_cik}.json"
-        
-        # Fetch from SEC API
-        response = session.get(url, timeout=10)
-
-        # Handle not found
-        if response.status_code == 404:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"CIK {cik} not found in SEC database."
-            )
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract basic info
-        registrant_name = data.get("name", "Unknown Registrant")
-
-        # Get recent filings
-        filings = data.get("filings", {}).get("recent", {})
-        forms = filings.get("form", [])
-        accession_numbers = filings.get("accessionNumber", [])
-        filing_dates = filings.get("filingDate", [])
-        primary_documents = filings.get("primaryDocument", [])
-
-        # Filter to only N-PORT forms
-        nport_records = []
-        for form, acc, date, doc in zip(forms, accession_numbers, filing_dates, primary_documents):
-            if form in NPORT_FORMS:
-                nport_records.append({
-                    "form": form,
-                    "accession": acc,
-                    "date": date,
-                    "primary_doc": doc,
-                })
-
-        # Check if we found any N-PORT filings
-        if not nport_records:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No N-PORT filings found for {registrant_name} (CIK: {cik}).",
-            )
-
-        # Find the most recent filing date
-        most_recent_date = max(record["date"] for record in nport_records)
-        
-        # Get all filings from that date
-        latest_filings = [r for r in nport_records if r["date"] == most_recent_date]
-        
-        # Sort for consistency
-        latest_filings.sort(key=lambda r: (r["form"], r["accession"]))
-
-        logger.info(
-            f"Found {len(latest_filings)} N-PORT filings on {most_recent_date} "
-            f"for {registrant_name} ({cik})"
-        )
-
-        # Pick the first one as default
-        default_filing = latest_filings[0]
-
-        return {
-            "name": registrant_name,
-            "latest_date": most_recent_date,
-            "default_accession": default_filing["accession"],
-            "default_primary_doc": default_filing["primary_doc"],
-            "default_form": default_filing["form"],
-            "latest_date_nport_filings": latest_filings,
-        }
-
-    except HTTPException:
-        raise
-    except requests.RequestException as e:
-        logger.error(f"Network error for CIK {cik}: {str(e)}")
-        raise HTTPException(status_code=503, detail="SEC API unavailable.")
-
-
-@lru_cache(maxsize=128)
-def fetch_html_content(html_url: str) -> bytes:
-    """Download and cache HTML content from SEC"""
-    response = session.get(html_url, timeout=60)
-
-    # Handle rate limiting from SEC
-    if response.status_code == 403:
-        raise HTTPException(
-            status_code=403, 
-            detail="SEC blocked request. Wait and retry."
-        )
-
-    # Handle other errors
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Could not fetch filing (HTTP {response.status_code}). Document may not be available."
-        )
-
-    return response.content
-
-
-def extract_series_name(html_content: bytes) -> Optional[str]:
-    """
-    Try to extract the series name from N-PORT HTML.
-    Returns None if not found.
-    """
-    try:
-        soup = BeautifulSoup(html_content, "lxml")
-
-        # Method 1: Look in Part A, Item A.2
-        part_a = soup.find(
-            "h1",
-            string=lambda text: text and "NPORT-P: Part A: General Information" in text,
-        )
-        
-        if part_a:
-            item_a2 = part_a.find_next(
-                "h4",
-                string=lambda text: text and "Item A.2. Information about the Series" in text,
-            )
-            
-            if item_a2:
-                table = item_a2.find_next("table")
-                if table:
-                    cells = table.find_all("td")
-                    for idx, cell in enumerate(cells):
-                        text = cell.get_text(strip=True)
-                        if "a. Name of Series" in text and idx + 1 < len(cells):
-                            name = cells[idx + 1].get_text(strip=True)
-                            if name:
-                                return name
-
-        # Method 2: Look for Item B.1
-        series_headers = soup.find_all(
-            "h4",
-            string=lambda text: text and "Item B.1. Name of series" in text,
-        )
-        
-        for header in series_headers:
-            table = header.find_next("table")
-            if table:
-                cells = table.find_all("td")
-                for idx, cell in enumerate(cells):
-                    if "a. Name of series" in cell.get_text(strip=True) and idx + 1 < len(cells):
-                        name = cells[idx + 1].get_text(strip=True)
-                        if name:
-                            return name
-
-        # Method 3: Generic search
-        for cell in soup.find_all("td"):
-            text = cell.get_text(strip=True)
-            if "Name of series" in text:
-                next_cell = cell.find_next_sibling("td")
-                if next_cell:
-                    name = next_cell.get_text(strip=True)
-                    if name:
-                        return name
-
-        return None
-
-    except Exception as e:
-        logger.warning(f"Could not extract series name: {str(e)}")
-        return None
-
-
-def parse_nport_html(html_content: bytes, cik: str, limit: Optional[int] = None) -> tuple[List[Dict], Optional[str]]:
-    """
-    Parse N-PORT HTML to extract portfolio holdings.
-    Returns (holdings_list, reporting_period)
-    """
-    try:
-        soup = BeautifulSoup(html_content, 'lxml')
-        holdings = []
-
-        # First, try to get the reporting period
-        reporting_period = None
-        general_info_sections = soup.find_all(
-            'h1', 
-            string=lambda text: text and 'NPORT-P: Part A: General Information' in text
-        )
-        
-        for section in general_info_sections:
-            period_header = section.find_next(
-                'h4', 
-                string=lambda text: text and 'Item A.3. Reporting period' in text
-            )
-            
-            if period_header:
-                table = period_header.find_next('table')
-                if table:
-                    date_cell = table.find(
-                        'td', 
-                        string=lambda text: text and 'b. Date as of which information is reported' in text
-                    )
-                    if date_cell:
-                        reporting_period = date_cell.find_next_sibling('td').get_text(strip=True)
-                        break
-
-        # Now find all investment sections
-        investment_headers = soup.find_all(
-            'h1', 
-            string=lambda text: text and 'NPORT-P: Part C: Schedule of Portfolio Investments' in text
-        )
-
-        logger.info(f"Found {len(investment_headers)} investments in HTML")
-
-        # Process each investment
-        for idx, investment in enumerate(investment_headers):
-            # Stop if we hit the limit
-            if limit and idx >= limit:
-                break
-
-            holding = {}
-
-            # Get identification info (Item C.1)
-            c1_header = investment.find_next(
-                'h4', 
-                string=lambda text: text and 'Item C.1. Identification of investment' in text
-            )
-            
-            if c1_header:
-                c1_table = c1_header.find_next('table')
-                if c1_table:
-                    cells = c1_table.find_all('td')
-                    cell_texts = [c.get_text(strip=True) for c in cells]
-
-                    for i, text in enumerate(cell_texts):
-                        if 'a. Name of issuer' in text and i + 1 < len(cell_texts):
-                            holding["title"] = cell_texts[i + 1]
-                        elif 'd. CUSIP' in text and i + 1 < len(cell_texts):
-                            holding["cusip"] = cell_texts[i + 1]
-
-            # Get amount info (Item C.2)
-            c2_header = investment.find_next(
-                'h4', 
-                string=lambda text: text and 'Item C.2. Amount of each investment' in text
-            )
-            
-            if c2_header:
-                c2_table = c2_header.find_next('table')
-                if c2_table:
-                    cells = c2_table.find_all('td')
-                    cell_texts = [c.get_text(strip=True) for c in cells]
-
-                    for i, text in enumerate(cell_texts):
-                        if 'Balance' in text and i + 1 < len(cell_texts):
-                            try:
-                                value = float(cell_texts[i + 1].replace(',', ''))
-                                # Handle infinity and NaN
-                                if math.isinf(value) or math.isnan(value):
-                                    holding["balance"] = 0.0
-                                else:
-                                    holding["balance"] = value
-                            except (ValueError, AttributeError):
-                                holding["balance"] = 0.0
-                                
-                        elif 'Report values in U.S. dollars' in text and i + 1 < len(cell_texts):
-                            try:
-                                value = float(cell_texts[i + 1].replace(',', ''))
-                                # Handle infinity and NaN
-                                if math.isinf(value) or math.isnan(value):
-                                    holding["value"] = 0.0
-                                else:
-                                    holding["value"] = value
-                            except (ValueError, AttributeError):
-                                holding["value"] = 0.0
-
-            # Only add if we have minimum required data
-            if holding.get("title") and "value" in holding:
-                # Fill in missing fields with defaults
-                if "cusip" not in holding:
-                    holding["cusip"] = "N/A"
-                if "balance" not in holding:
-                    holding["balance"] = 0.0
-                    
-                holdings.append(holding)
-
-        if not holdings:
-            logger.warning("No holdings extracted from HTML")
-
-        return holdings, reporting_period
-
-    except Exception as e:
-        logger.error(f"HTML parsing error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to parse HTML filing: {str(e)}")
-
-
-@lru_cache(maxsize=64)
-def get_holdings_cached(cik: str, limit: Optional[int] = None):
-    """
-    Main function to fetch and parse N-PORT holdings.
-    Handles multiple filings on the same date.
-    """
-    start_time = time.time()
-
-    # Get metadata about available filings
-    metadata = get_nport_metadata(cik)
-    fund_name = metadata["name"]
-    filing_date = metadata["latest_date"]
-    available_filings = metadata["latest_date_nport_filings"]
-
-    results = []
-
-    # Process each filing
-    for idx, filing in enumerate(available_filings):
-        accession = filing["accession"]
-        primary_doc = filing["primary_doc"]
-        form_type = filing["form"]
-
-        # Build URL
-        accession_no_dash = accession.replace("-", "")
-        
-        if primary_doc:
-            url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/{primary_doc}"
-        else:
-            url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/primary_doc.xml"
-
-        logger.info(f"Fetching HTML from: {url}")
-
-        # Try to download the HTML
-        try:
-            html_content = fetch_html_content(url)
-        except HTTPException as e:
-            # Try alternative URLs if primary fails
-            if e.status_code == 404:
-                alternative_urls = [
-                    f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={cik}&accession_number={accession}&xbrl_type=v",
-                    f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/xslFormNPORT-P_X01/primary_doc.xml",
-                ]
-                
-                html_content = None
-                for alt_url in alternative_urls:
-                    logger.info(f"Trying alternative URL: {alt_url}")
-                    try:
-                        html_content = fetch_html_content(alt_url)
-                        url = alt_url
-                        break
-                    except Exception:
-                        continue
-                
-                if html_content is None:
-                    logger.warning(f"Skipping filing {accession}: could not fetch HTML")
-                    continue
-            else:
-                raise
-        except requests.Timeout:
-            raise HTTPException(status_code=504, detail="Request timeout.")
-        except Exception as e:
-            logger.error(f"Error fetching HTML for {accession}: {str(e)}")
-            continue
-
-        # Try to extract series name
-        series_name = extract_series_name(html_content)
-
-        # Parse the HTML
-        holdings, reporting_period = parse_nport_html(html_content, cik, limit)
-
-        if not holdings:
-            logger.warning(
-                f"No holdings found in filing {accession}. "
-                "The document may use a non-standard format."
-            )
-            continue
-
-        # Use reporting period if available, otherwise use filing date
-        effective_date = reporting_period or filing_date
-        
-        # Calculate total assets
-        total_assets = sum(h.get("value", 0) for h in holdings)
-
-        # Generate a default series name if we couldn't extract one
-        if not series_name:
-            series_name = f"Series {chr(65 + idx)}"  # Series A, B, C, etc.
-
-        results.append({
-            "form": form_type,
-            "series_name": series_name,
-            "accession_number": accession,
-            "filing_url": url,
-            "filing_date": effective_date,
-            "holdings_count": len(holdings),
-            "total_assets": total_assets,
-            "holdings": holdings,
-        })
-
-    # Make sure we got at least one valid filing
-    if not results:
-        raise HTTPException(
-            status_code=422,
-            detail="No holdings found in any latest-date N-PORT filings for this CIK.",
-        )
-
-    elapsed = time.time() - start_time
-    logger.info(
-        f"Successfully extracted holdings from {len(results)} N-PORT filings "
-        f"for {fund_name} in {elapsed:.2f}s"
-    )
-
-    return {
-        "cik": cik,
-        "registrant_name": fund_name,
-        "latest_date": filing_date,
-        "filing_groups": results,
-        "processing_time": f"{elapsed:.2f}s",
-    }
-
-
-async def stream_holdings_generator(cik: str, limit: Optional[int] = None, task_id: str = None):
-    """
-    Generator that yields holdings data as Server-Sent Events.
-    Each series is sent as soon as it's ready.
-    """
-    try:
-        if task_id:
-            active_tasks[task_id] = asyncio.current_task()
-
-        if task_id and task_id in active_tasks and active_tasks[task_id].done():
-            yield f"data: {json.dumps({'type': 'cancelled'})}\n\n"
-            return
-
-        start_time = time.time()
-
-        # Get metadata about available filings
-        metadata = get_nport_metadata(cik)
-        fund_name = metadata["name"]
-        filing_date = metadata["latest_date"]
-        available_filings = metadata["latest_date_nport_filings"]
-
-        # Send initial metadata
-        yield f"data: {json.dumps({'type': 'metadata', 'registrant_name': fund_name, 'latest_date': filing_date, 'total_filings': len(available_filings)})}\n\n"
-
-        processed_count = 0
-
-        # Process each filing and stream results
-        for idx, filing in enumerate(available_filings):
-            accession = filing["accession"]
-            primary_doc = filing["primary_doc"]
-            form_type = filing["form"]
-
-            # Send progress update
-            yield f"data: {json.dumps({'type': 'progress', 'current': idx + 1, 'total': len(available_filings), 'accession': accession})}\n\n"
-
-            # Build URL
-            accession_no_dash = accession.replace("-", "")
-            
-            if primary_doc:
-                url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/{primary_doc}"
-            else:
-                url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/primary_doc.xml"
-
-            logger.info(f"Streaming: Fetching HTML from: {url}")
-
-            # Try to download the HTML
-            try:
-                html_content = fetch_html_content(url)
-            except HTTPException as e:
-                # Try alternative URLs if primary fails
-                if e.status_code == 404:
-                    alternative_urls = [
-                        f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={cik}&accession_number={accession}&xbrl_type=v",
-                        f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/xslFormNPORT-P_X01/primary_doc.xml",
-                    ]
-                    
-                    html_content = None
-                    for alt_url in alternative_urls:
-                        logger.info(f"Trying alternative URL: {alt_url}")
-                        try:
-                            html_content = fetch_html_content(alt_url)
-                            url = alt_url
-                            break
-                        except Exception:
-                            continue
-                    
-                    if html_content is None:
-                        logger.warning(f"Skipping filing {accession}: could not fetch HTML")
-                        yield f"data: {json.dumps({'type': 'error', 'accession': accession, 'message': 'Could not fetch HTML'})}\n\n"
-                        continue
-                else:
-                    raise
-            except requests.Timeout:
-                yield f"data: {json.dumps({'type': 'error', 'accession': accession, 'message': 'Request timeout'})}\n\n"
-                continue
-            except Exception as e:
-                logger.error(f"Error fetching HTML for {accession}: {str(e)}")
-                yield f"data: {json.dumps({'type': 'error', 'accession': accession, 'message': str(e)})}\n\n"
-                continue
-
-            # Try to extract series name
-            series_name = extract_series_name(html_content)
-
-            # Parse the HTML
-            holdings, reporting_period = parse_nport_html(html_content, cik, limit)
-
-            if not holdings:
-                logger.warning(f"No holdings found in filing {accession}")
-                yield f"data: {json.dumps({'type': 'warning', 'accession': accession, 'message': 'No holdings found'})}\n\n"
-                continue
-
-            # Use reporting period if available, otherwise use filing date
-            effective_date = reporting_period or filing_date
-            
-            # Calculate total assets
-            total_assets = sum(h.get("value", 0) for h in holdings)
-
-            # Generate a default series name if we couldn't extract one
-            if not series_name:
-                series_name = f"Series {chr(65 + idx)}"  # Series A, B, C, etc.
-
-            # Send this series result immediately
-            result = {
-                "type": "series",
-                "index": processed_count,
-                "data": {
-                    "form": form_type,
-                    "series_name": series_name,
-                    "accession_number": accession,
-                    "filing_url": url,
-                    "filing_date": effective_date,
-                    "holdings_count": len(holdings),
-                    "total_assets": total_assets,
-                    "holdings": holdings,
-                }
-            }
-            
-            yield f"data: {json.dumps(result)}\n\n"
-            processed_count += 1
-
-            # Small delay to prevent overwhelming the client
-            await asyncio.sleep(0.1)
-
-        # Send completion message
-        elapsed = time.time() - start_time
-        yield f"data: {json.dumps({'type': 'complete', 'total_processed': processed_count, 'processing_time': f'{elapsed:.2f}s'})}\n\n"
-
-    except HTTPException as e:
-        yield f"data: {json.dumps({'type': 'error', 'message': e.detail, 'status_code': e.status_code})}\n\n"
-    except Exception as e:
-        logger.error(f"Streaming error: {str(e)}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-
-
-@app.get("/holdings/{cik}/stream")
-async def stream_holdings(
-    request: Request,
-    cik: str,
-    limit: Optional[int] = Query(None),
-    task_id: Optional[str] = Query(None)
-):
-    clean_cik = cik.strip().zfill(10) 
-    if not clean_cik.isdigit():
-        raise HTTPException(status_code=00, detail="Invalid CIK format.")
-
-    # Generate task_id if not provided
-    stream_task_id = task_id or str(uuid.uuid4())
-    
-    return StreamingResponse(
-        stream_holdings_generator(clean_cik, limit, stream_task_id),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-            "X-Task-ID": stream_task_id
-        }
-    )
-
-
-@app.post("/stream/{task_id}/cancel")
-async def cancel_stream(task_id: str):
-    """Cancel a streaming request by task_id"""
-    if task_id in active_tasks:
-        active_tasks[task_id].cancel()
-        del active_tasks[task_id]
-        return {"status": "cancelled", "task_id": task_id}
-    return {"status": "not_found", "task_id": task_id}
-
-
-@app.get("/holdings/{cik}")
-def get_holdings(
-    request: Request,
-    cik: str,
-    limit: Optional[int] = Query(None, description="Limit number of holdings returned (default: all)")
-):
-    """
-    Main API endpoint to get N-PORT holdings for a CIK.
-    Returns all results at once (use /holdings/{cik}/stream for progressive loading).
-    """
-    # 🚀 NORMALIZE CIK BEFORE VALIDATION
-    clean_cik = cik.strip().zfill(10)  # Always pad to 10 digits FIRST
-    
-    if not clean_cik.isdigit():
-        raise HTTPException(status_code=400, detail="Invalid CIK format.")
-
-    # Return cached result (always uses 10-digit CIK)
-    return get_holdings_cached(clean_cik, limit)
-
-
-
-@app.delete("/cache/clear")
-def clear_cache():
-    """Clear all LRU caches (useful for development)"""
-    get_nport_metadata.cache_clear()
-    get_holdings_cached.cache_clear()
-    fetch_html_content.cache_clear()
-    
-    return {
-        "status": "cache cleared", 
-        "timestamp": datetime.now().isoformat()
-    }
-
-
-@app.get("/cache/info")
-def cache_info():
-    """Get statistics about cache usage"""
-    metadata_info = get_nport_metadata.cache_info()
-    html_info = fetch_html_content.cache_info()
-    holdings_info = get_holdings_cached.cache_info()
-    
-    return {
-        "metadata_cache": {
-            "size": metadata_info.currsize,
-            "maxsize": metadata_info.maxsize,
-            "hits": metadata_info.hits,
-            "misses": metadata_info.misses,
-        },
-        "html_cache": {
-            "size": html_info.currsize,
-            "maxsize": html_info.maxsize,
-            "hits": html_info.hits,
-            "misses": html_info.misses,
-        },
-        "holdings_cache": {
-            "size": holdings_info.currsize,
-            "maxsize": holdings_info.maxsize,
-            "hits": holdings_info.hits,
-            "misses": holdings_info.misses,
-        }
-    }
\ No newline at end of file
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
+import httpx
+import orjson
+from lxml import etree
+from functools import lru_cache, wraps
+from fastnumbers import fast_float
+from cachetools.func import ttl_cache
+import logging
+from typing import List, Dict, Optional
+import sys
+import time
+import threading
+import math
+import json
+import hashlib
+import asyncio
+from collections import namedtuple, OrderedDict
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import signal
+import uuid
+import os
+from io import BytesIO
+from pathlib import Path
+
+
+
+# Setup basic logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app
+class OrjsonResponse(Response):
+    """JSON response rendered with orjson.
+
+    Several times faster than the stdlib encoder on multi-thousand-row
+    holdings payloads. (FastAPI's own ORJSONResponse is deprecated in the
+    pinned version, hence the local class.)
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+app = FastAPI(title="SEC N-PORT Viewer", default_response_class=OrjsonResponse)
+
+# Cancellation flags by task_id, for /stream/{task_id}/cancel. The
+# stream checks its flag between filings and winds down cleanly instead
+# of being killed mid-write. Bounded LRU-style so streams that never
+# finish cleanly (client vanished before the generator started) cannot
+# grow the registry forever.
+_CANCEL_EVENTS_MAX = 10_000
+cancel_events: "OrderedDict[str, asyncio.Event]" = OrderedDict()
+
+
+# Configure CORS to allow frontend access
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Holdings payloads are highly repetitive JSON and compress >10x; skip
+# tiny responses where the gzip header overhead isn't worth it. The
+# middleware excludes text/event-stream by default, but its streaming
+# mode sync-flushes per chunk, so the SSE endpoint compresses safely
+# without batching events.
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024,
+    exclude_content_types=tuple(
+        ct for ct in DEFAULT_EXCLUDED_CONTENT_TYPES if ct != "text/event-stream"
+    ),
+)
+
+# SEC requires proper headers for API access
+SEC_HEADERS = {
+    "User-Agent": "NPortViewer/1.0 contact@example.com",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Reusable client for connection pooling; HTTP/2 multiplexes the many
+# small SEC requests over a single warm TLS connection
+session = httpx.Client(
+    http2=True,
+    headers=SEC_HEADERS,
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=100),
+)
+
+# All valid N-PORT form types
+NPORT_FORMS = {"NPORT-P", "NPORT-P/A", "NPORT-NRT", "NPORT-NRT/A"}
+
+# Section headings and cell labels matched against the start of the
+# (stripped) element text. str.startswith runs as a single C-level check
+# per heading, where the old substring scans walked the whole string.
+_H1_PART_A = 'NPORT-P: Part A: General Information'
+_H1_PART_C = 'NPORT-P: Part C: Schedule of Portfolio Investments'
+_H4_ITEM_A2 = 'Item A.2. Information about the Series'
+_H4_ITEM_A3 = 'Item A.3. Reporting period'
+_H4_ITEM_B1 = 'Item B.1. Name of series'
+_H4_ITEM_C1 = 'Item C.1. Identification of investment'
+_H4_ITEM_C2 = 'Item C.2. Amount of each investment'
+_LABEL_ISSUER = 'a. Name of issuer'
+_LABEL_CUSIP = 'd. CUSIP'
+_LABEL_BALANCE = 'Balance'
+_LABEL_VALUE_USD = 'Report values in U.S. dollars'
+_LABEL_REPORT_DATE = 'b. Date as of which information is reported'
+_LABEL_SERIES_NAME = 'a. Name of Series'
+_LABEL_SERIES_NAME_B1 = 'a. Name of series'
+
+# Field routing for investment tables: one hash lookup per label instead
+# of a branch chain per cell pair. Keyed by the exact label text, with a
+# cached prefix fallback for labels carrying trailing qualifiers.
+_FIELD_BY_LABEL = {
+    _LABEL_ISSUER: 'title',
+    _LABEL_CUSIP: 'cusip',
+    _LABEL_BALANCE: 'balance',
+    _LABEL_VALUE_USD: 'value',
+}
+
+
+@lru_cache(maxsize=256)
+def _field_for_label(label: str) -> Optional[str]:
+    """Prefix-match fallback for labels not matching exactly"""
+    for prefix, field in _FIELD_BY_LABEL.items():
+        if label.startswith(prefix):
+            return field
+    return None
+
+# Strips thousands separators in a single C call, no per-call allocation
+# of pattern state
+_COMMA_STRIP = str.maketrans('', '', ',')
+
+@dataclass(slots=True)
+class Holding:
+    """One portfolio investment row.
+
+    Slots cut per-row memory to roughly a quarter of an equivalent dict,
+    which matters at thousands of holdings per fund. None marks a field
+    not yet seen while the row is being assembled. Subscript access is
+    kept so rows still read like the dicts they replaced.
+    """
+
+    title: Optional[str] = None
+    cusip: Optional[str] = None
+    balance: Optional[float] = None
+    value: Optional[float] = None
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+
+
+def _parse_decimal(text: str) -> float:
+    """
+    Parse a numeric cell like '1,234.56' to float.
+    Malformed, infinite or NaN values become 0.0.
+    """
+    # One C call covering conversion, the malformed-input fallback and
+    # the inf/nan guard; no exception machinery on any path
+    return fast_float(text.translate(_COMMA_STRIP), default=0.0, inf=0.0, nan=0.0)
+
+
+# How often the background task prunes idle IPs that is_allowed never
+# touches again (they'd otherwise only be cleaned on their next request)
+_RATE_LIMITER_SWEEP_INTERVAL = 600.0
+
+
+async def _rate_limiter_sweeper():
+    while True:
+        await asyncio.sleep(_RATE_LIMITER_SWEEP_INTERVAL)
+        rate_limiter.sweep()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    sweeper = asyncio.create_task(_rate_limiter_sweeper())
+    yield
+    # Shutdown - cleanup tasks
+    sweeper.cancel()
+    session.close()
+    for event in cancel_events.values():
+        event.set()
+    cancel_events.clear()
+app.router.lifespan_context = lifespan
+
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: int = 10, requests_per_hour: int = 100):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_hour = requests_per_hour
+        # Fixed-window counters: ip -> [bucket_id, count]. A bucket id is
+        # int(now // window); when it changes the count resets. One list
+        # mutation per request instead of a timestamp deque scan, at the
+        # cost of windows aligned to bucket boundaries rather than
+        # sliding. Plain dicts so probing IPs don't pin empty entries.
+        self.minute_requests = {}
+        self.hour_requests = {}
+
+    @staticmethod
+    def _bucket_count(table: Dict, ip: str, bucket: int) -> int:
+        """Count of requests this IP has made in the current bucket"""
+        entry = table.get(ip)
+        if entry is None or entry[0] != bucket:
+            return 0
+        return entry[1]
+
+    def is_allowed(self, ip: str) -> tuple[bool, Optional[str]]:
+        """
+        Check if this IP can make another request.
+        Returns (allowed, error_message)
+        """
+        now = time.monotonic()
+
+        minute_count = self._bucket_count(self.minute_requests, ip, int(now // 60.0))
+        hour_count = self._bucket_count(self.hour_requests, ip, int(now // 3600.0))
+
+        if minute_count >= self.requests_per_minute:
+            return False, f"Rate limit exceeded: {self.requests_per_minute} requests/min"
+
+        if hour_count >= self.requests_per_hour:
+            # Freeze for 15 minutes on hour limit
+            freeze_until = datetime.now() + timedelta(minutes=15)
+            return False, f"Hourly limit hit. Frozen until {freeze_until.strftime('%H:%M')}"
+
+        return True, None
+
+    def add_request(self, ip: str):
+        """Count this request against the IP's current buckets"""
+        now = time.monotonic()
+        for table, window in ((self.minute_requests, 60.0), (self.hour_requests, 3600.0)):
+            bucket = int(now // window)
+            entry = table.get(ip)
+            if entry is None or entry[0] != bucket:
+                table[ip] = [bucket, 1]
+            else:
+                entry[1] += 1
+
+    def sweep(self):
+        """Drop IPs whose buckets have rolled over (periodic housekeeping)"""
+        now = time.monotonic()
+        for table, window in ((self.minute_requests, 60.0), (self.hour_requests, 3600.0)):
+            bucket = int(now // window)
+            for ip in [ip for ip, entry in table.items() if entry[0] != bucket]:
+                del table[ip]
+
+    def get_stats(self, ip: str) -> Dict:
+        """Get rate limit stats for IP"""
+        now = time.monotonic()
+
+        minute_count = self._bucket_count(self.minute_requests, ip, int(now // 60.0))
+        hour_count = self._bucket_count(self.hour_requests, ip, int(now // 3600.0))
+
+        return {
+            "requests_last_minute": minute_count,
+            "requests_last_hour": hour_count,
+            "limit_minute": self.requests_per_minute,
+            "limit_hour": self.requests_per_hour,
+            "remaining_minute": self.requests_per_minute - minute_count,
+            "remaining_hour": self.requests_per_hour - hour_count
+        }
+
+class RedisRateLimiter:
+    """
+    Rolling-window rate limiter backed by Redis sorted sets.
+
+    Unlike the in-process RateLimiter, this enforces one shared quota
+    across all uvicorn workers. Cleanup, count and insert run as a single
+    Lua script so concurrent requests can't race past the limit.
+    """
+
+    # ZREMRANGEBYSCORE drops expired entries, ZCARD counts what's left;
+    # the request is only recorded when it fits under the limit. The
+    # returned count is pre-insert, so the caller checks `count < limit`.
+    _WINDOW_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[2]) then
+    return count
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[5])
+return count
+"""
+
+    def __init__(self, redis_client, requests_per_minute: int = 10, requests_per_hour: int = 100):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_hour = requests_per_hour
+        self.redis = redis_client
+        # register_script uses EVALSHA after the first load
+        self._window = redis_client.register_script(self._WINDOW_SCRIPT)
+
+    async def _hit_window(self, key: str, window_seconds: int, limit: int) -> int:
+        """Run the window script for one key; returns the pre-insert count"""
+        now = time.time()
+        member = f"{now:.6f}-{uuid.uuid4().hex}"
+        return await self._window(
+            keys=[key],
+            args=[now - window_seconds, limit, now, member, window_seconds * 1000],
+        )
+
+    async def is_allowed(self, ip: str) -> tuple[bool, Optional[str]]:
+        """
+        Check if this IP can make another request, recording it if so.
+        Returns (allowed, error_message)
+        """
+        minute_count = await self._hit_window(f"rl:m:{ip}", 60, self.requests_per_minute)
+        if minute_count >= self.requests_per_minute:
+            return False, f"Rate limit exceeded: {self.requests_per_minute} requests/min"
+
+        hour_count = await self._hit_window(f"rl:h:{ip}", 3600, self.requests_per_hour)
+        if hour_count >= self.requests_per_hour:
+            # Freeze for 15 minutes on hour limit
+            freeze_until = datetime.now() + timedelta(minutes=15)
+            return False, f"Hourly limit hit. Frozen until {freeze_until.strftime('%H:%M')}"
+
+        return True, None
+
+    async def get_stats(self, ip: str) -> Dict:
+        """Get rate limit stats for IP"""
+        now = time.time()
+        minute_count = await self.redis.zcount(f"rl:m:{ip}", now - 60, "+inf")
+        hour_count = await self.redis.zcount(f"rl:h:{ip}", now - 3600, "+inf")
+
+        return {
+            "requests_last_minute": minute_count,
+            "requests_last_hour": hour_count,
+            "limit_minute": self.requests_per_minute,
+            "limit_hour": self.requests_per_hour,
+            "remaining_minute": self.requests_per_minute - minute_count,
+            "remaining_hour": self.requests_per_hour - hour_count
+        }
+
+
+# Create global instance AFTER class definition
+rate_limiter = RateLimiter()
+
+# With multiple uvicorn workers the in-process limiter enforces a quota
+# per worker; point REDIS_URL at a Redis instance to share one quota.
+redis_rate_limiter = None
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    import redis.asyncio as aioredis
+
+    redis_rate_limiter = RedisRateLimiter(aioredis.from_url(REDIS_URL))
+
+
+
+def get_client_ip(request: Request) -> str:
+    """Extract the real client IP, handling proxies"""
+    # Check if behind a proxy
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        # Take the first IP in the chain
+        return forwarded.split(",")[0].strip()
+
+    # Check for real IP header
+    real_ip = request.headers.get("X-Real-IP")
+    if real_ip:
+        return real_ip
+
+    # Fallback to direct connection IP
+    return request.client.host if request.client else "unknown"
+
+
+@app.middleware("http")
+async def rate_limit_middleware(request: Request, call_next):
+    excluded_paths = ["/", "/cache/clear", "/rate-limit/stats", "/cache/info"]
+    if request.url.path in excluded_paths:
+        return await call_next(request)
+
+    client_ip = get_client_ip(request)
+
+    if redis_rate_limiter is not None:
+        # The Lua script checks and records in one atomic call
+        allowed, error_msg = await redis_rate_limiter.is_allowed(client_ip)
+    else:
+        allowed, error_msg = rate_limiter.is_allowed(client_ip)
+
+    if not allowed:
+        logger.warning(f"Rate limit hit for IP: {client_ip}")
+        return OrjsonResponse(
+            status_code=429,
+            content={"detail": error_msg, "client_ip": client_ip},
+            headers={"Retry-After": "60"}
+        )
+
+    if redis_rate_limiter is None:
+        # ADD THIS LINE - track the request
+        rate_limiter.add_request(client_ip)
+
+    response = await call_next(request)
+
+    # Update headers with current stats
+    if redis_rate_limiter is not None:
+        stats = await redis_rate_limiter.get_stats(client_ip)
+    else:
+        stats = rate_limiter.get_stats(client_ip)
+    response.headers["X-RateLimit-Limit-Minute"] = str(stats["limit_minute"])
+    response.headers["X-RateLimit-Remaining-Minute"] = str(stats["remaining_minute"])
+    response.headers["X-RateLimit-Limit-Hour"] = str(stats["limit_hour"])
+    response.headers["X-RateLimit-Remaining-Hour"] = str(stats["remaining_hour"])
+    
+    return response
+
+
+@app.get("/")
+def health():
+    """Simple health check endpoint"""
+    return {"status": "running", "service": "SEC N-PORT Viewer"}
+
+
+@app.get("/rate-limit/stats")
+async def rate_limit_stats(request: Request):
+    """Check your current rate limit status"""
+    client_ip = get_client_ip(request)
+    if redis_rate_limiter is not None:
+        stats = await redis_rate_limiter.get_stats(client_ip)
+    else:
+        stats = rate_limiter.get_stats(client_ip)
+    stats["client_ip"] = client_ip
+    return stats
+
+
+def _response_json(response):
+    """Decode a response body with orjson, falling back to response.json()"""
+    content = response.content
+    if isinstance(content, (bytes, str)):
+        return orjson.loads(content)
+    return response.json()
+
+
+@lru_cache(maxsize=1024)
+def _normalize_cik(raw: str) -> tuple[str, bool]:
+    """Normalize a raw CIK path param to 10 digits; returns (clean, valid)"""
+    stripped = raw.strip()
+    # Validate before padding: SEC CIKs are at most 10 digits, and the
+    # checks are pure str ops with no exception path
+    if not (stripped.isdigit() and len(stripped) <= 10):
+        return stripped, False
+    return stripped.zfill(10), True
+
+
+# Validators and last parsed result per submissions URL, so an expired
+# metadata cache entry revalidates with a conditional GET (a few hundred
+# bytes on 304) instead of re-downloading the full submissions body
+_METADATA_VALIDATORS_MAX = 256
+_metadata_validators: OrderedDict = OrderedDict()
+
+
+# submissions.json updates intraday, so expire entries after 5 minutes
+@ttl_cache(maxsize=256, ttl=300)
+def get_nport_metadata(cik: str):
+    """
+    Fetch N-PORT filing metadata from SEC for a given CIK.
+    Returns info about all N-PORT filings on the latest date.
+    """
+    try:
+        # Pad CIK to 10 digits
+        padded_cik = cik.zfill(10)
+        url = f"https://data.sec.gov/submissions/CIK{padded_cik}.json"
+        
+        request_headers = {}
+        known = _metadata_validators.get(url)
+        if known is not None:
+            etag, last_modified, _ = known
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        # Fetch from SEC API
+        response = session.get(url, timeout=10, headers=request_headers)
+
+        # Unchanged upstream — reuse the previously parsed result
+        if response.status_code == 304 and known is not None:
+            return known[2]
+
+        # Handle not found
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"CIK {cik} not found in SEC database."
+            )
+        
+        response.raise_for_status()
+        data = _response_json(response)
+
+        # Extract basic info
+        registrant_name = data.get("name", "Unknown Registrant")
+
+        # Get recent filings
+        filings = data.get("filings", {}).get("recent", {})
+        forms = filings.get("form", [])
+        accession_numbers = filings.get("accessionNumber", [])
+        filing_dates = filings.get("filingDate", [])
+        primary_documents = filings.get("primaryDocument", [])
+
+        # Single pass over the (potentially thousands of) recent filings:
+        # filter to N-PORT forms and track the most recent date as we go,
+        # keeping only that date's rows instead of materializing them all.
+        nport_forms = NPORT_FORMS
+        most_recent_date = ""
+        latest_rows: list = []
+        for row in zip(forms, accession_numbers, filing_dates, primary_documents):
+            if row[0] in nport_forms:
+                date = row[2]
+                if date > most_recent_date:
+                    most_recent_date = date
+                    latest_rows = [row]
+                elif date == most_recent_date:
+                    latest_rows.append(row)
+
+        # Check if we found any N-PORT filings
+        if not latest_rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No N-PORT filings found for {registrant_name} (CIK: {cik}).",
+            )
+
+        # Sort for consistency
+        latest_rows.sort()
+        latest_filings = [
+            {"form": form, "accession": acc, "date": date, "primary_doc": doc}
+            for form, acc, date, doc in latest_rows
+        ]
+
+        logger.info(
+            f"Found {len(latest_filings)} N-PORT filings on {most_recent_date} "
+            f"for {registrant_name} ({cik})"
+        )
+
+        # Pick the first one as default
+        default_filing = latest_filings[0]
+
+        result = {
+            "name": registrant_name,
+            "latest_date": most_recent_date,
+            "default_accession": default_filing["accession"],
+            "default_primary_doc": default_filing["primary_doc"],
+            "default_form": default_filing["form"],
+            "latest_date_nport_filings": latest_filings,
+        }
+
+        etag = _validator_header(response, "ETag")
+        last_modified = _validator_header(response, "Last-Modified")
+        if etag or last_modified:
+            _metadata_validators[url] = (etag, last_modified, result)
+            _metadata_validators.move_to_end(url)
+            while len(_metadata_validators) > _METADATA_VALIDATORS_MAX:
+                _metadata_validators.popitem(last=False)
+
+        return result
+
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error(f"Network error for CIK {cik}: {str(e)}")
+        raise HTTPException(status_code=503, detail="SEC API unavailable.")
+
+
+# Pool for fetching same-date filings in parallel; sized below SEC's
+# ~10 requests/second guidance.
+_fetch_pool = ThreadPoolExecutor(max_workers=8)
+
+
+def _fetch_filing_html(cik: str, filing: Dict) -> tuple[Optional[bytes], str]:
+    """
+    Download the HTML for one filing, trying alternative URLs on 404.
+    Returns (html_content, url); html_content is None if unavailable.
+    """
+    accession = filing["accession"]
+    primary_doc = filing["primary_doc"]
+
+    # Build URL
+    accession_no_dash = accession.replace("-", "")
+
+    if primary_doc:
+        url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/{primary_doc}"
+    else:
+        url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/primary_doc.xml"
+
+    logger.info(f"Fetching HTML from: {url}")
+
+    try:
+        return fetch_html_content(url), url
+    except HTTPException as e:
+        # Try alternative URLs if primary fails
+        if e.status_code != 404:
+            raise
+
+        alternative_urls = [
+            f"https://www.sec.gov/cgi-bin/viewer?action=view&cik={cik}&accession_number={accession}&xbrl_type=v",
+            f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_no_dash}/xslFormNPORT-P_X01/primary_doc.xml",
+        ]
+
+        for alt_url in alternative_urls:
+            logger.info(f"Trying alternative URL: {alt_url}")
+            try:
+                return fetch_html_content(alt_url), alt_url
+            except Exception:
+                continue
+
+        logger.warning(f"Skipping filing {accession}: could not fetch HTML")
+        return None, url
+
+
+_CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _validator_header(response, name: str) -> Optional[str]:
+    """Return a response header if it carries a usable string value"""
+    value = response.headers.get(name)
+    return value if isinstance(value, str) else None
+
+
+class _HtmlDiskCache:
+    """
+    On-disk cache for filing HTML with conditional revalidation.
+
+    The previous in-memory LRU pinned up to 128 raw bodies — potentially
+    tens of MB each — in process RAM for the process lifetime. Bodies now
+    live on disk, and repeat fetches revalidate with If-None-Match /
+    If-Modified-Since, so an unchanged filing costs a 304 with no body.
+    """
+
+    def __init__(self, base_path: Path):
+        self.base_path = base_path
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        return self.base_path / f"{key}.body", self.base_path / f"{key}.json"
+
+    def load(self, url: str) -> Optional[tuple[bytes, Optional[str], Optional[str]]]:
+        """Returns (content, etag, last_modified) or None if not cached"""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            content = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return content, meta.get("etag"), meta.get("last_modified")
+
+    def store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+        body_path, meta_path = self._paths(url)
+        try:
+            self.base_path.mkdir(parents=True, exist_ok=True)
+            body_path.write_bytes(content)
+            meta_path.write_text(json.dumps({
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+            }))
+        except OSError as e:
+            logger.warning(f"Could not write HTML cache for {url}: {str(e)}")
+
+    def cache_clear(self):
+        for path in self.base_path.glob("*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self.hits = 0
+        self.misses = 0
+
+    def cache_info(self) -> _CacheInfo:
+        currsize = sum(1 for _ in self.base_path.glob("*.body"))
+        return _CacheInfo(self.hits, self.misses, None, currsize)
+
+
+_html_cache = _HtmlDiskCache(Path(__file__).resolve().parent / ".cache" / "sec")
+
+
+def fetch_html_content(html_url: str) -> bytes:
+    """Download HTML content from SEC, revalidating the on-disk copy"""
+    cached = _html_cache.load(html_url)
+
+    request_headers = {}
+    if cached is not None:
+        _content, etag, last_modified = cached
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    response = session.get(html_url, timeout=60, headers=request_headers)
+
+    # Unchanged since we last saw it — reuse the on-disk body
+    if response.status_code == 304 and cached is not None:
+        _html_cache.hits += 1
+        return cached[0]
+
+    # Handle rate limiting from SEC
+    if response.status_code == 403:
+        raise HTTPException(
+            status_code=403, 
+            detail="SEC blocked request. Wait and retry."
+        )
+
+    # Handle other errors
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Could not fetch filing (HTTP {response.status_code}). Document may not be available."
+        )
+
+    _html_cache.misses += 1
+    content = response.content
+    _html_cache.store(
+        html_url,
+        content,
+        _validator_header(response, "ETag"),
+        _validator_header(response, "Last-Modified"),
+    )
+    return content
+
+
+def _element_text(el) -> str:
+    """Concatenated text of an element (iterparse yields bare _Elements)"""
+    return ''.join(el.itertext())
+
+
+def _parse_filing_worker(html_content: bytes, limit: Optional[int]) -> tuple[List[Holding], Optional[str], Optional[str], array]:
+    """
+    Single streaming pass over one filing extracting holdings, reporting
+    period and series name together.
+
+    iterparse only materializes the subtree behind the cursor and each
+    processed element is freed immediately, so peak memory stays around
+    one holding instead of the whole document tree. May run in the parse
+    pool, so it only raises ordinary (picklable) exceptions; callers
+    translate failures into HTTPException.
+    """
+    holdings = []
+    # Values also accumulate as a flat double array alongside the rows,
+    # so aggregation over them (totals) runs over a contiguous C buffer
+    # instead of walking row objects
+    values_col = array('d')
+    reporting_period = None
+
+    # Nothing to scan — skip parser construction entirely
+    if not html_content:
+        return holdings, reporting_period, None, values_col
+
+    # Series name candidates in priority order: Part A Item A.2 beats
+    # Item B.1 beats a generic "Name of series" cell.
+    series_a2 = None
+    series_b1 = None
+    series_generic = None
+
+    # Track which section the cursor is in and assemble one holding at a
+    # time; a new Part C header flushes the previous holding. This keeps
+    # the whole extraction to one pass in document order.
+    holding = None           # holding currently being assembled
+    mode = None              # what the next <table> belongs to
+    in_part_a = False
+    investment_count = 0
+
+    def flush(h):
+        # Only add if we have minimum required data
+        if h and h.title and h.value is not None:
+            # Fill in missing fields with defaults
+            if h.cusip is None:
+                h.cusip = "N/A"
+            if h.balance is None:
+                h.balance = 0.0
+
+            holdings.append(h)
+            values_col.append(h.value)
+
+    context = etree.iterparse(
+        BytesIO(html_content), events=('end',), tag=('h1', 'h4', 'table'), html=True
+    )
+
+    for _event, el in context:
+        tag = el.tag
+
+        if tag == 'h1':
+            text = _element_text(el).strip()
+            mode = None
+            if text.startswith(_H1_PART_C):
+                flush(holding)
+                holding = None
+                in_part_a = False
+                # Stop if we hit the limit
+                if limit and investment_count >= limit:
+                    break
+                holding = Holding()
+                investment_count += 1
+            else:
+                flush(holding)
+                holding = None
+                in_part_a = text.startswith(_H1_PART_A)
+
+        elif tag == 'h4':
+            text = _element_text(el).strip()
+            mode = None
+            if holding is not None:
+                if text.startswith(_H4_ITEM_C1):
+                    mode = 'c1'
+                elif text.startswith(_H4_ITEM_C2):
+                    mode = 'c2'
+            elif text.startswith(_H4_ITEM_B1) and series_b1 is None:
+                mode = 'b1'
+            elif in_part_a:
+                if text.startswith(_H4_ITEM_A2) and series_a2 is None:
+                    mode = 'a2'
+                elif text.startswith(_H4_ITEM_A3) and reporting_period is None:
+                    mode = 'period'
+
+        else:  # table
+            # Only look at cells when a header claimed this table, or when
+            # the generic series fallback is still unresolved
+            need_generic_series = (
+                series_a2 is None and series_b1 is None and series_generic is None
+            )
+            if mode is not None or need_generic_series:
+                cells = el.findall('.//td')
+
+                # Label/value cells come in adjacent pairs; walking them
+                # pairwise extracts text only for the labels actually
+                # inspected, and each branch stops as soon as its fields
+                # are filled instead of scanning the remaining cells.
+                if mode == 'c1' or mode == 'c2':
+                    first, second = ('title', 'cusip') if mode == 'c1' else ('balance', 'value')
+                    it = iter(cells)
+                    for label_cell, value_cell in zip(it, it):
+                        label = _element_text(label_cell).strip()
+                        field = _FIELD_BY_LABEL.get(label) or _field_for_label(label)
+                        if field != first and field != second:
+                            continue
+                        value = _element_text(value_cell).strip()
+                        if mode == 'c2':
+                            value = _parse_decimal(value)
+                        setattr(holding, field, value)
+                        # Both of this table's fields seen — skip the rest
+                        if getattr(holding, first) is not None and getattr(holding, second) is not None:
+                            break
+
+                elif mode == 'period':
+                    it = iter(cells)
+                    for label_cell, value_cell in zip(it, it):
+                        if _element_text(label_cell).strip().startswith(_LABEL_REPORT_DATE):
+                            reporting_period = _element_text(value_cell).strip()
+                            break
+
+                elif mode == 'a2':
+                    it = iter(cells)
+                    for label_cell, value_cell in zip(it, it):
+                        if _element_text(label_cell).strip().startswith(_LABEL_SERIES_NAME):
+                            name = _element_text(value_cell).strip()
+                            if name:
+                                series_a2 = name
+                                break
+
+                elif mode == 'b1':
+                    it = iter(cells)
+                    for label_cell, value_cell in zip(it, it):
+                        if _element_text(label_cell).strip().startswith(_LABEL_SERIES_NAME_B1):
+                            name = _element_text(value_cell).strip()
+                            if name:
+                                series_b1 = name
+                                break
+
+                if need_generic_series and series_a2 is None and series_b1 is None:
+                    for cell in cells:
+                        if 'Name of series' in _element_text(cell):
+                            sibling = cell.getnext()
+                            if sibling is not None and sibling.tag == 'td':
+                                name = _element_text(sibling).strip()
+                                if name:
+                                    series_generic = name
+                                    break
+
+                mode = None
+
+                # With the limit reached and the final holding fully
+                # populated, nothing past this table can change the
+                # result — stop before the next section header
+                if (
+                    limit
+                    and investment_count >= limit
+                    and holding is not None
+                    and holding.title is not None
+                    and holding.cusip is not None
+                    and holding.balance is not None
+                    and holding.value is not None
+                ):
+                    flush(holding)
+                    holding = None
+                    break
+
+        # Free the processed element and everything before it; this is
+        # what keeps memory flat on multi-MB filings
+        el.clear()
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+    flush(holding)
+
+    logger.info(f"Found {investment_count} investments in HTML")
+
+    if not holdings:
+        logger.warning("No holdings extracted from HTML")
+
+    return holdings, reporting_period, series_a2 or series_b1 or series_generic, values_col
+
+
+def parse_nport_html(html_content: bytes, cik: str, limit: Optional[int] = None) -> tuple[List[Holding], Optional[str]]:
+    """
+    Parse N-PORT HTML to extract portfolio holdings.
+    Returns (holdings_list, reporting_period)
+    """
+    try:
+        holdings, reporting_period, _, _ = _parse_filing_worker(html_content, limit)
+        return holdings, reporting_period
+    except Exception as e:
+        logger.error(f"HTML parsing error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to parse HTML filing: {str(e)}")
+
+
+def extract_series_name(html_content: bytes) -> Optional[str]:
+    """
+    Try to extract the series name from N-PORT HTML.
+    Returns None if not found.
+    """
+    try:
+        return _parse_filing_worker(html_content, None)[2]
+    except Exception as e:
+        logger.warning(f"Could not extract series name: {str(e)}")
+        return None
+
+
+# Parsed-filing cache keyed by content hash, so the same accession isn't
+# re-parsed across CIK requests or stream reconnects. BLAKE2b is cheaper
+# than SHA-256 on bodies this size, and hashing is a tiny fraction of a
+# full parse.
+# Below this size, pickling content across the process boundary costs
+# more than just parsing it inline
+_PARSE_POOL_MIN_BYTES = 64 * 1024
+
+_PARSE_CACHE_MAX = 128
+_parse_cache: OrderedDict = OrderedDict()
+_parse_cache_hits = 0
+_parse_cache_misses = 0
+
+
+# Pool for CPU-bound parsing. lxml holds the GIL while it builds the
+# tree, so parsing in-process would serialize concurrent async requests;
+# separate processes parse in parallel across cores.
+_parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _parse_cache_lookup(key) -> Optional[tuple]:
+    global _parse_cache_hits, _parse_cache_misses
+
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        _parse_cache.move_to_end(key)
+        _parse_cache_hits += 1
+        return cached
+
+    _parse_cache_misses += 1
+    return None
+
+
+# Issuer names and CUSIPs repeat heavily across a fund's filings (and
+# across pool-parsed results, which come back as fresh strings after
+# unpickling). Sharing one copy per distinct value cuts resident string
+# bytes for everything pinned by the caches. Titles go through a capped
+# pool (also emptied by /cache/clear); CUSIPs are short and use
+# sys.intern.
+_STRING_POOL_MAX = 50_000
+_STRING_POOL: Dict[str, str] = {}
+
+
+def _intern_holdings(holdings: List[Holding]):
+    pool = _STRING_POOL
+    if len(pool) > _STRING_POOL_MAX:
+        # Reset rather than grow without bound; copies referenced by
+        # still-cached results stay alive through those results, and the
+        # pool re-fills from live data on subsequent parses
+        pool.clear()
+    for h in holdings:
+        h.title = pool.setdefault(h.title, h.title)
+        h.cusip = sys.intern(h.cusip)
+
+
+def _parse_cache_store(key, result: tuple):
+    _intern_holdings(result[0])
+    _parse_cache[key] = result
+    if len(_parse_cache) > _PARSE_CACHE_MAX:
+        _parse_cache.popitem(last=False)
+
+
+def parse_filing(html_content: bytes, cik: str, limit: Optional[int] = None) -> tuple[List[Holding], Optional[str], Optional[str], array]:
+    """
+    Parse one filing, extracting holdings, reporting period and series
+    name in a single streaming pass.
+    Returns (holdings_list, reporting_period, series_name)
+    """
+    key = (hashlib.blake2b(html_content, digest_size=16).digest(), limit)
+    cached = _parse_cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    try:
+        result = _parse_filing_worker(html_content, limit)
+    except Exception as e:
+        logger.error(f"HTML parsing error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to parse HTML filing: {str(e)}")
+
+    _parse_cache_store(key, result)
+    return result
+
+
+async def parse_filing_async(html_content: bytes, cik: str, limit: Optional[int] = None) -> tuple[List[Holding], Optional[str], Optional[str], array]:
+    """
+    Like parse_filing, but cache misses parse in the process pool so the
+    event loop stays responsive while the GIL-bound work runs.
+    """
+    key = (hashlib.blake2b(html_content, digest_size=16).digest(), limit)
+    cached = _parse_cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    try:
+        if len(html_content) < _PARSE_POOL_MIN_BYTES:
+            # Small documents parse faster inline than the IPC round trip
+            result = _parse_filing_worker(html_content, limit)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_parse_pool, _parse_filing_worker, html_content, limit)
+    except Exception as e:
+        logger.error(f"HTML parsing error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to parse HTML filing: {str(e)}")
+
+    _parse_cache_store(key, result)
+    return result
+
+
+def _stale_while_revalidate(fresh_ttl: float, stale_ttl: float, maxsize: int):
+    """
+    Two-tier TTL cache: entries younger than fresh_ttl are served
+    directly; entries younger than stale_ttl are served immediately while
+    a background thread recomputes them, keeping tail latency flat when a
+    hot CIK's cache entry expires. Exposes the same cache_info() /
+    cache_clear() surface as the other caches.
+    """
+    def decorator(func):
+        cache: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        lock = threading.Lock()
+        refreshing: set = set()
+        hits = misses = 0
+
+        def store(key, value):
+            with lock:
+                cache[key] = (time.monotonic(), value)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+        def refresh(key):
+            try:
+                value = func(*key)
+            except Exception as e:
+                # Keep serving the stale value; the next stale hit retries
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            else:
+                store(key, value)
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        @wraps(func)
+        def wrapper(*args):
+            nonlocal hits, misses
+            key = args
+            now = time.monotonic()
+            with lock:
+                entry = cache.get(key)
+                if entry is not None:
+                    age = now - entry[0]
+                    if age < stale_ttl:
+                        hits += 1
+                        cache.move_to_end(key)
+                        if age >= fresh_ttl and key not in refreshing:
+                            refreshing.add(key)
+                            threading.Thread(
+                                target=refresh, args=(key,), daemon=True
+                            ).start()
+                        return entry[1]
+                    del cache[key]
+                misses += 1
+            value = func(*args)
+            store(key, value)
+            return value
+
+        def cache_info():
+            with lock:
+                return _CacheInfo(hits, misses, maxsize, len(cache))
+
+        def cache_clear():
+            nonlocal hits, misses
+            with lock:
+                cache.clear()
+                refreshing.clear()
+                hits = misses = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+# Fresh for 15 minutes; after that a stale copy is served for up to a day
+# while the refresh happens off the request path
+@_stale_while_revalidate(fresh_ttl=900.0, stale_ttl=86400.0, maxsize=64)
+def get_holdings_cached(cik: str, limit: Optional[int] = None):
+    """
+    Main function to fetch and parse N-PORT holdings.
+    Handles multiple filings on the same date.
+    """
+    start_time = time.time()
+
+    # Get metadata about available filings
+    metadata = get_nport_metadata(cik)
+    fund_name = metadata["name"]
+    filing_date = metadata["latest_date"]
+    available_filings = metadata["latest_date_nport_filings"]
+
+    results = []
+
+    def fetch_one(filing: Dict) -> tuple[Optional[bytes], str]:
+        try:
+            return _fetch_filing_html(cik, filing)
+        except HTTPException:
+            raise
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="Request timeout.")
+        except Exception as e:
+            logger.error(f"Error fetching HTML for {filing['accession']}: {str(e)}")
+            return None, ""
+
+    # Download all same-date filings in parallel; K filings cost roughly
+    # one round trip instead of K. Results come back in filing order.
+    fetched = list(_fetch_pool.map(fetch_one, available_filings))
+
+    # Process each filing
+    for idx, (filing, (html_content, url)) in enumerate(zip(available_filings, fetched)):
+        accession = filing["accession"]
+        form_type = filing["form"]
+
+        if html_content is None:
+            continue
+
+        # Parse holdings + series name in one pass (cached by content hash)
+        holdings, reporting_period, series_name, values_col = parse_filing(html_content, cik, limit)
+
+        if not holdings:
+            logger.warning(
+                f"No holdings found in filing {accession}. "
+                "The document may use a non-standard format."
+            )
+            continue
+
+        # Use reporting period if available, otherwise use filing date
+        effective_date = reporting_period or filing_date
+        
+        # Calculate total assets
+        total_assets = math.fsum(values_col)
+
+        # Generate a default series name if we couldn't extract one
+        if not series_name:
+            series_name = f"Series {chr(65 + idx)}"  # Series A, B, C, etc.
+
+        results.append({
+            "form": form_type,
+            "series_name": series_name,
+            "accession_number": accession,
+            "filing_url": url,
+            "filing_date": effective_date,
+            "holdings_count": len(holdings),
+            "total_assets": total_assets,
+            "holdings": holdings,
+        })
+
+    # Make sure we got at least one valid filing
+    if not results:
+        raise HTTPException(
+            status_code=422,
+            detail="No holdings found in any latest-date N-PORT filings for this CIK.",
+        )
+
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Successfully extracted holdings from {len(results)} N-PORT filings "
+        f"for {fund_name} in {elapsed:.2f}s"
+    )
+
+    return {
+        "cik": cik,
+        "registrant_name": fund_name,
+        "latest_date": filing_date,
+        "filing_groups": results,
+        "processing_time": f"{elapsed:.2f}s",
+    }
+
+
+def _sse(payload: Dict) -> bytes:
+    """Encode one Server-Sent Event frame. orjson emits bytes directly,
+    and its C encoder is several times faster than stdlib json on the
+    per-series payloads, which carry hundreds of holding dicts."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+async def stream_holdings_generator(cik: str, limit: Optional[int] = None, task_id: str = None):
+    """
+    Generator that yields holdings data as Server-Sent Events.
+    Each series is sent as soon as it's ready.
+    """
+    try:
+        start_time = time.time()
+
+        # Get metadata about available filings; a cold TTL entry does a
+        # blocking SEC fetch, so keep it off the event loop
+        metadata = await asyncio.to_thread(get_nport_metadata, cik)
+        fund_name = metadata["name"]
+        filing_date = metadata["latest_date"]
+        available_filings = metadata["latest_date_nport_filings"]
+
+        # Send initial metadata
+        yield _sse({'type': 'metadata', 'registrant_name': fund_name, 'latest_date': filing_date, 'total_filings': len(available_filings)})
+
+        processed_count = 0
+
+        # Kick off every download up front on the fetch pool; results are
+        # consumed in filing order below, so later filings download while
+        # earlier ones are parsed and streamed.
+        fetches = [
+            _fetch_pool.submit(_fetch_filing_html, cik, filing)
+            for filing in available_filings
+        ]
+
+        # Process each filing and stream results
+        cancel_event = cancel_events.get(task_id) if task_id else None
+
+        for idx, (filing, fetch) in enumerate(zip(available_filings, fetches)):
+            # Bail out between filings if the client asked to cancel
+            if cancel_event is not None and cancel_event.is_set():
+                yield _sse({'type': 'cancelled', 'processed': processed_count})
+                break
+
+            accession = filing["accession"]
+            form_type = filing["form"]
+
+            # Send progress update
+            yield _sse({'type': 'progress', 'current': idx + 1, 'total': len(available_filings), 'accession': accession})
+
+            # Collect the download
+            try:
+                html_content, url = await asyncio.wrap_future(fetch)
+            except HTTPException:
+                raise
+            except httpx.TimeoutException:
+                yield _sse({'type': 'error', 'accession': accession, 'message': 'Request timeout'})
+                continue
+            except Exception as e:
+                logger.error(f"Error fetching HTML for {accession}: {str(e)}")
+                yield _sse({'type': 'error', 'accession': accession, 'message': str(e)})
+                continue
+
+            if html_content is None:
+                yield _sse({'type': 'error', 'accession': accession, 'message': 'Could not fetch HTML'})
+                continue
+
+            # Parse holdings + series name in one pass (cached by content
+            # hash); misses run in the parse pool off the event loop
+            holdings, reporting_period, series_name, values_col = await parse_filing_async(html_content, cik, limit)
+
+            if not holdings:
+                logger.warning(f"No holdings found in filing {accession}")
+                yield _sse({'type': 'warning', 'accession': accession, 'message': 'No holdings found'})
+                continue
+
+            # Use reporting period if available, otherwise use filing date
+            effective_date = reporting_period or filing_date
+            
+            # Calculate total assets
+            total_assets = math.fsum(values_col)
+
+            # Generate a default series name if we couldn't extract one
+            if not series_name:
+                series_name = f"Series {chr(65 + idx)}"  # Series A, B, C, etc.
+
+            # Send this series result immediately
+            result = {
+                "type": "series",
+                "index": processed_count,
+                "data": {
+                    "form": form_type,
+                    "series_name": series_name,
+                    "accession_number": accession,
+                    "filing_url": url,
+                    "filing_date": effective_date,
+                    "holdings_count": len(holdings),
+                    "total_assets": total_assets,
+                    "holdings": holdings,
+                }
+            }
+            
+            yield _sse(result)
+            processed_count += 1
+
+            # Yield to the loop between series so cancellation can land;
+            # SSE over TCP is already flow-controlled, no need to throttle
+            await asyncio.sleep(0)
+
+        # Send completion message
+        elapsed = time.time() - start_time
+        yield _sse({'type': 'complete', 'total_processed': processed_count, 'processing_time': f'{elapsed:.2f}s'})
+
+    except HTTPException as e:
+        yield _sse({'type': 'error', 'message': e.detail, 'status_code': e.status_code})
+    except Exception as e:
+        logger.error(f"Streaming error: {str(e)}")
+        yield _sse({'type': 'error', 'message': str(e)})
+    finally:
+        if task_id:
+            cancel_events.pop(task_id, None)
+
+
+@app.get("/holdings/{cik}/stream")
+async def stream_holdings(
+    request: Request,
+    cik: str,
+    limit: Optional[int] = Query(None),
+    task_id: Optional[str] = Query(None)
+):
+    clean_cik, valid = _normalize_cik(cik)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid CIK format.")
+
+    # Generate task_id if not provided
+    stream_task_id = task_id or str(uuid.uuid4())
+
+    # Register a cancellation flag for this stream; the generator pops it
+    # when the stream ends
+    cancel_events[stream_task_id] = asyncio.Event()
+    cancel_events.move_to_end(stream_task_id)
+    while len(cancel_events) > _CANCEL_EVENTS_MAX:
+        cancel_events.popitem(last=False)
+
+    return StreamingResponse(
+        stream_holdings_generator(clean_cik, limit, stream_task_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "X-Task-ID": stream_task_id
+        }
+    )
+
+
+@app.post("/stream/{task_id}/cancel")
+async def cancel_stream(task_id: str):
+    """Cancel a streaming request by task_id"""
+    event = cancel_events.get(task_id)
+    if event is not None:
+        event.set()
+        return {"status": "cancelled", "task_id": task_id}
+    return {"status": "not_found", "task_id": task_id}
+
+
+@app.get("/holdings/{cik}")
+def get_holdings(
+    request: Request,
+    cik: str,
+    limit: Optional[int] = Query(None, description="Limit number of holdings returned (default: all)")
+):
+    """
+    Main API endpoint to get N-PORT holdings for a CIK.
+    Returns all results at once (use /holdings/{cik}/stream for progressive loading).
+    """
+    # 🚀 NORMALIZE CIK BEFORE VALIDATION
+    clean_cik, valid = _normalize_cik(cik)  # Always pad to 10 digits FIRST
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid CIK format.")
+
+    # Return cached result (always uses 10-digit CIK)
+    return get_holdings_cached(clean_cik, limit)
+
+
+
+@app.delete("/cache/clear")
+def clear_cache():
+    """Clear all LRU caches (useful for development)"""
+    global _parse_cache_hits, _parse_cache_misses
+
+    get_nport_metadata.cache_clear()
+    _metadata_validators.clear()
+    get_holdings_cached.cache_clear()
+    _html_cache.cache_clear()
+    _parse_cache.clear()
+    _parse_cache_hits = 0
+    _parse_cache_misses = 0
+    _STRING_POOL.clear()
+
+    return {
+        "status": "cache cleared", 
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/cache/info")
+def cache_info():
+    """Get statistics about cache usage"""
+    metadata_info = get_nport_metadata.cache_info()
+    html_info = _html_cache.cache_info()
+    holdings_info = get_holdings_cached.cache_info()
+    
+    return {
+        "metadata_cache": {
+            "size": metadata_info.currsize,
+            "maxsize": metadata_info.maxsize,
+            "hits": metadata_info.hits,
+            "misses": metadata_info.misses,
+        },
+        "html_cache": {
+            "size": html_info.currsize,
+            "maxsize": html_info.maxsize,
+            "hits": html_info.hits,
+            "misses": html_info.misses,
+        },
+        "holdings_cache": {
+            "size": holdings_info.currsize,
+            "maxsize": holdings_info.maxsize,
+            "hits": holdings_info.hits,
+            "misses": holdings_info.misses,
+        },
+        "parse_cache": {
+            "size": len(_parse_cache),
+            "maxsize": _PARSE_CACHE_MAX,
+            "hits": _parse_cache_hits,
+            "misses": _parse_cache_misses,
+        }
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop + httptools come with uvicorn[standard]; for production use
+    # multiple workers (uvicorn --workers or gunicorn with the uvicorn
+    # worker class) so parse CPU spreads across processes
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
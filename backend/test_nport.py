@@ -1,11 +1,12 @@
 import pytest
-import requests  
+import httpx
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from fastapi import HTTPException
-from main import app, get_nport_metadata, parse_nport_html, get_holdings_cached, rate_limiter
+from main import app, get_nport_metadata, parse_nport_html, get_holdings_cached, rate_limiter, RateLimiter
 import math
 import json
+import time
 import asyncio
 # Create test client
 client = TestClient(app)
@@ -88,6 +89,86 @@ def test_rate_limiting_per_minute():
     assert "Rate limit exceeded" in response.json()["detail"]
 
 
+def test_rate_limiter_bucket_rollover():
+    """Test that a fresh minute bucket resets the count"""
+    limiter = RateLimiter(requests_per_minute=2, requests_per_hour=100)
+
+    with patch("main.time.monotonic", return_value=30.0):
+        limiter.add_request("1.2.3.4")
+        limiter.add_request("1.2.3.4")
+        allowed, message = limiter.is_allowed("1.2.3.4")
+        assert not allowed
+        assert "Rate limit exceeded" in message
+
+    # Next minute bucket: the counter starts over
+    with patch("main.time.monotonic", return_value=90.0):
+        allowed, message = limiter.is_allowed("1.2.3.4")
+        assert allowed
+        assert message is None
+
+
+def test_rate_limiter_sweep_drops_idle_ips():
+    """Test that sweep removes IPs whose buckets have rolled over"""
+    limiter = RateLimiter()
+
+    with patch("main.time.monotonic", return_value=30.0):
+        limiter.add_request("1.2.3.4")
+        assert "1.2.3.4" in limiter.minute_requests
+        assert "1.2.3.4" in limiter.hour_requests
+
+    # Both windows have rolled over an hour later
+    with patch("main.time.monotonic", return_value=7200.0):
+        limiter.sweep()
+
+    assert limiter.minute_requests == {}
+    assert limiter.hour_requests == {}
+
+
+def test_redis_rate_limiter_blocks_at_limit():
+    """Test the Redis limiter against a fake window script"""
+    from main import RedisRateLimiter
+
+    counts = {}
+    calls = []
+
+    class FakeScript:
+        async def __call__(self, keys, args):
+            calls.append(keys[0])
+            return counts.get(keys[0], 0)
+
+    fake_redis = Mock()
+    fake_redis.register_script.return_value = FakeScript()
+    limiter = RedisRateLimiter(fake_redis, requests_per_minute=2, requests_per_hour=5)
+
+    allowed, message = asyncio.run(limiter.is_allowed("1.2.3.4"))
+    assert allowed
+    assert message is None
+    # One script call per window, keyed by window and IP
+    assert calls == ["rl:m:1.2.3.4", "rl:h:1.2.3.4"]
+
+    # The script reports the minute window full
+    counts["rl:m:1.2.3.4"] = 2
+    allowed, message = asyncio.run(limiter.is_allowed("1.2.3.4"))
+    assert not allowed
+    assert "Rate limit exceeded" in message
+
+
+def test_redis_rate_limiter_stats_shape():
+    """Test that Redis limiter stats match the in-process shape"""
+    from main import RedisRateLimiter
+
+    fake_redis = Mock()
+    fake_redis.register_script.return_value = Mock()
+    fake_redis.zcount = AsyncMock(side_effect=[3, 7])
+    limiter = RedisRateLimiter(fake_redis, requests_per_minute=10, requests_per_hour=100)
+
+    stats = asyncio.run(limiter.get_stats("1.2.3.4"))
+    assert stats["requests_last_minute"] == 3
+    assert stats["requests_last_hour"] == 7
+    assert stats["remaining_minute"] == 7
+    assert stats["remaining_hour"] == 93
+
+
 def test_rate_limit_headers():
     """Test that rate limit headers are present"""
     response = client.get("/rate-limit/stats")
@@ -360,6 +441,11 @@ def test_get_holdings_invalid_cik():
     assert response.status_code == 400
     assert "Invalid CIK format" in response.json()["detail"]
 
+    # More than 10 digits can never be a CIK, even though it's all-numeric
+    response = client.get("/holdings/12345678901")
+    assert response.status_code == 400
+    assert "Invalid CIK format" in response.json()["detail"]
+
 
 def test_get_holdings_with_limit():
     """Test holdings endpoint with limit parameter"""
@@ -380,6 +466,41 @@ def test_cache_clear():
     assert "timestamp" in response.json()
 
 
+def test_stale_while_revalidate_serves_stale_and_refreshes():
+    """Test that the holdings cache serves stale values while refreshing"""
+    from main import _stale_while_revalidate
+
+    calls = []
+
+    @_stale_while_revalidate(fresh_ttl=10.0, stale_ttl=100.0, maxsize=4)
+    def compute(key):
+        calls.append(key)
+        return len(calls)
+
+    with patch("main.time.monotonic", return_value=0.0):
+        assert compute("a") == 1
+
+    # Within the fresh TTL: cached, no recompute
+    with patch("main.time.monotonic", return_value=5.0):
+        assert compute("a") == 1
+        assert len(calls) == 1
+
+    with patch("main.time.monotonic", return_value=50.0):
+        # Stale: the old value comes back immediately...
+        assert compute("a") == 1
+
+        # ...while a background thread recomputes and stores it; further
+        # stale hits don't pile on extra refreshes
+        for _ in range(200):
+            if compute("a") == 2:
+                break
+            time.sleep(0.01)
+
+        # The refreshed value is now served as fresh
+        assert compute("a") == 2
+        assert len(calls) == 2
+
+
 def test_metadata_caching(mock_session):
     """Test that metadata is cached properly"""
     mock_response = Mock()
@@ -408,6 +529,45 @@ def test_metadata_caching(mock_session):
     assert result1 == result2
 
 
+def test_metadata_304_reuses_cached_result(mock_session):
+    """Test that a 304 revalidation reuses the previously parsed metadata"""
+    from main import _metadata_validators
+
+    first_response = Mock()
+    first_response.status_code = 200
+    first_response.headers = {"ETag": '"abc123"'}
+    first_response.json.return_value = {
+        "name": "Test Fund",
+        "filings": {
+            "recent": {
+                "form": ["NPORT-P"],
+                "accessionNumber": ["0001234567-24-000001"],
+                "filingDate": ["2024-03-31"],
+                "primaryDocument": ["primary_doc.xml"]
+            }
+        }
+    }
+    mock_session.get.return_value = first_response
+
+    try:
+        result1 = get_nport_metadata("0001166559")
+        assert result1["name"] == "Test Fund"
+
+        # Expire the TTL entry; the refetch revalidates with the stored
+        # ETag and gets a 304 back
+        get_nport_metadata.cache_clear()
+        revalidation = Mock()
+        revalidation.status_code = 304
+        mock_session.get.return_value = revalidation
+
+        result2 = get_nport_metadata("0001166559")
+        assert result2 == result1
+        sent_headers = mock_session.get.call_args.kwargs["headers"]
+        assert sent_headers["If-None-Match"] == '"abc123"'
+    finally:
+        _metadata_validators.clear()
+
+
 def test_stream_cancel():
     """Test cancelling a stream returns proper response"""
     # Test non-existent task
@@ -420,6 +580,59 @@ def test_stream_cancel():
     assert response.status_code == 200
     assert "status" in response.json()
 
+def test_stream_cancel_sets_registered_event():
+    """Test that cancelling a registered stream sets its event"""
+    from main import cancel_events
+
+    event = asyncio.Event()
+    cancel_events["test-cancel-123"] = event
+    try:
+        response = client.post("/stream/test-cancel-123/cancel")
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        assert event.is_set()
+    finally:
+        cancel_events.pop("test-cancel-123", None)
+
+
+def test_stream_emits_cancelled_frame(mock_session):
+    """Test that a cancelled stream winds down with a cancelled event"""
+    from main import cancel_events, stream_holdings_generator
+
+    metadata_response = Mock()
+    metadata_response.status_code = 200
+    metadata_response.json.return_value = {
+        "name": "Test Fund",
+        "filings": {
+            "recent": {
+                "form": ["NPORT-P"],
+                "accessionNumber": ["0001234567-24-000001"],
+                "filingDate": ["2024-03-31"],
+                "primaryDocument": ["primary_doc.xml"]
+            }
+        }
+    }
+    html_response = Mock()
+    html_response.status_code = 200
+    html_response.content = b"<html>mock html</html>"
+    mock_session.get.side_effect = [metadata_response, html_response]
+
+    event = asyncio.Event()
+    event.set()
+    cancel_events["cancelled-stream"] = event
+
+    async def collect():
+        frames = []
+        async for frame in stream_holdings_generator("0001166559", None, "cancelled-stream"):
+            frames.append(frame)
+        return frames
+
+    frames = asyncio.run(collect())
+    assert any(b'"cancelled"' in frame for frame in frames)
+    # The generator removes its registration when the stream ends
+    assert "cancelled-stream" not in cancel_events
+
+
 def test_stream_holdings_headers(mock_session):
     """Test streaming endpoint returns correct headers"""
     metadata_response = Mock()
@@ -455,8 +668,8 @@ def test_holdings_rate_limit_403(mock_session):
     mock_response.status_code = 403
     mock_response.json.return_value = {}
     # Simulate raise_for_status raising HTTPError for 403
-    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(
-        response=mock_response
+    mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
+        "403 Forbidden", request=Mock(), response=mock_response
     )
     mock_session.get.return_value = mock_response
 
@@ -467,7 +680,7 @@ def test_holdings_rate_limit_403(mock_session):
 
 def test_holdings_timeout(mock_session):
     """Test handling timeout exception"""
-    mock_session.get.side_effect = requests.exceptions.Timeout("Request timed out")
+    mock_session.get.side_effect = httpx.TimeoutException("Request timed out")
     
     response = client.get("/holdings/0001166559")
     assert response.status_code == 503  